@@ -1,7 +1,9 @@
 '''Helper utilities for determining the current state of a pull request from e.g. its labels.'''
+import itertools
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum, auto
-from typing import List, NamedTuple
+from typing import Iterable, List, Optional, Tuple
 
 
 # The different kinds of PR labels we care about.
@@ -45,6 +47,38 @@ label_categorisation_rules: dict[str, LabelKind] = {
 }
 
 
+# Internally, we represent the set of label kinds present on a PR as a bitmask:
+# bit i is set if and only if the i-th relevant label kind is present.
+# "Other" labels are irrelevant for a PR's status, hence map to the empty mask.
+# Only presence matters for classifying a PR, so duplicate labels of the same kind
+# (e.g. a PR blocked on two different PRs) yield the same mask.
+_LABEL_BIT: dict[LabelKind, int] = {
+    kind: 1 << i for (i, kind) in enumerate(k for k in LabelKind if k is not LabelKind.Other)
+}
+_LABEL_BIT[LabelKind.Other] = 0
+# Inverse of the above: the label kind corresponding to each single-bit mask.
+_KIND_OF_BIT: dict[int, LabelKind] = {bit: kind for (kind, bit) in _LABEL_BIT.items() if bit}
+
+# Masks of label kinds which are involved in contradictory label combinations.
+# A decision label contradicts any of these.
+_DECISION_CONFLICT_MASK = (_LABEL_BIT[LabelKind.Author] | _LABEL_BIT[LabelKind.Review]
+    | _LABEL_BIT[LabelKind.Delegated] | _LABEL_BIT[LabelKind.Bors] | _LABEL_BIT[LabelKind.WIP])
+# A WIP label contradicts any of these.
+_WIP_CONFLICT_MASK = _LABEL_BIT[LabelKind.Review] | _LABEL_BIT[LabelKind.Bors]
+# Each of these pairs of label kinds is contradictory.
+_AUTHOR_REVIEW_MASK = _LABEL_BIT[LabelKind.Author] | _LABEL_BIT[LabelKind.Review]
+_BORS_BLOCKED_MASK = _LABEL_BIT[LabelKind.Bors] | _LABEL_BIT[LabelKind.Blocked]
+_BORS_HELP_WANTED_MASK = _LABEL_BIT[LabelKind.Bors] | _LABEL_BIT[LabelKind.HelpWanted]
+
+
+def _label_mask(labels: Iterable[LabelKind]) -> int:
+    '''Compute the bitmask of all relevant label kinds in `labels`'''
+    mask = 0
+    for l in labels:
+        mask |= _LABEL_BIT[l]
+    return mask
+
+
 class CIStatus(Enum):
     Pass = auto()
     Fail = auto()
@@ -52,16 +86,22 @@ class CIStatus(Enum):
 
 
 # All relevant state of a PR at each point in time.
-class PRState(NamedTuple):
-    labels: List[LabelKind]
+@dataclass(frozen=True, slots=True)
+class PRState:
+    labels: Tuple[LabelKind, ...]
     ci: CIStatus
     draft: bool
     """True if and only if this PR is marked as draft."""
+    # The bitmask of all relevant label kinds in `labels`, computed once on construction.
+    _mask: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_mask", _label_mask(self.labels))
 
     @staticmethod
-    def with_labels(labels : List[LabelKind]):
+    def with_labels(labels : Iterable[LabelKind]):
         '''Create a PR state with just these labels, passing CI and ready for review'''
-        return PRState(labels, CIStatus.Pass, False)
+        return PRState(tuple(labels), CIStatus.Pass, False)
 
 
 # Describes the current status of a pull request in terms of the categories we care about.
@@ -93,85 +133,108 @@ class PRStatus(Enum):
     """PR labels are contradictory: we cannot determine easily what this PR's status is"""
 
 
+# The PR status corresponding to each relevant label kind.
+_LABEL_TO_STATUS: dict[LabelKind, PRStatus] = {
+    LabelKind.WIP: PRStatus.NotReady,
+    LabelKind.Review: PRStatus.AwaitingReview,
+    LabelKind.HelpWanted: PRStatus.HelpWanted,
+    LabelKind.Author: PRStatus.AwaitingAuthor,
+    LabelKind.Blocked: PRStatus.Blocked,
+    LabelKind.MergeConflict: PRStatus.MergeConflict,
+    LabelKind.Decision: PRStatus.AwaitingDecision,
+    LabelKind.Delegated: PRStatus.Delegated,
+    LabelKind.Bors: PRStatus.AwaitingBors,
+}
+
+
 def label_to_prstatus(label: LabelKind) -> PRStatus:
-    return {
-        LabelKind.WIP: PRStatus.NotReady,
-        LabelKind.Review: PRStatus.AwaitingReview,
-        LabelKind.HelpWanted: PRStatus.HelpWanted,
-        LabelKind.Author: PRStatus.AwaitingAuthor,
-        LabelKind.Blocked: PRStatus.Blocked,
-        LabelKind.MergeConflict: PRStatus.MergeConflict,
-        LabelKind.Decision: PRStatus.AwaitingDecision,
-        LabelKind.Delegated: PRStatus.Delegated,
-        LabelKind.Bors: PRStatus.AwaitingBors,
-    }[label]
+    return _LABEL_TO_STATUS[label]
 
 
-def determine_PR_status(date: datetime, state: PRState) -> PRStatus:
-    '''Determine a PR's status from its state
-    'date' is necessary as the interpretation of the awaiting-review label changes over time'''
-    if state.draft or state.ci == CIStatus.Fail:
-        return PRStatus.NotReady
-    # Ignore all "other" labels, which are not relevant for this anyway.
-    labels = [l for l in state.labels if l != LabelKind.Other]
+# If a set of labels is not contradictory, we use a clear priority order:
+# from highest to lowest priority, the label kinds are ordered as
+# blocked > help wanted > WIP > decision > merge conflict > bors > author; review > delegate.
+# (Author and review have the same priority, but are contradictory when both present.)
+_LABEL_PRIORITY: dict[LabelKind, int] = {
+    LabelKind.Blocked: 11,
+    LabelKind.HelpWanted: 10,
+    LabelKind.WIP: 9,
+    LabelKind.Decision: 8,
+    LabelKind.MergeConflict: 7,
+    LabelKind.Bors: 6,
+    LabelKind.Author: 5,
+    LabelKind.Review: 5,
+    LabelKind.Delegated: 4,
+}
 
+
+def _classify_label_mask(mask: int) -> PRStatus:
+    '''Determine the status of a ready PR whose relevant label kinds are given by the non-zero bitmask `mask`'''
+    assert mask != 0
     # Labels can be contradictory (so we need to recognise this).
     # Also note that their priority orders are not transitive!
     # TODO: is this actually a problem for our algorithm?
-    # NB. A PR *can* legitimately have *two* labels of a blocked kind, for example,
-    # so we *do not* want to deduplicate the kinds here.
-    if labels == []:
-        # Until July 9th, a PR had to be labelled awaiting-review to be marked as such.
-        # After that date, the label is retired and PRs are considered ready for review
-        # by default.
-        if date > datetime(2024, 7, 9):
-            return PRStatus.AwaitingReview
-        else:
-            return PRStatus.AwaitingAuthor
-    elif len(labels) == 1:
-        return label_to_prstatus(labels[0])
+    if mask & (mask - 1) == 0:
+        # All relevant labels are of the same kind.
+        return _LABEL_TO_STATUS[_KIND_OF_BIT[mask]]
     else:
         # Some label combinations are contradictory. We mark the PR as in a "contradictory" state.
         # awaiting-decision is exclusive with any of waiting on review, author, delegation and sent to bors.
-        if LabelKind.Decision in labels and any([l for l in labels if
-                l in [LabelKind.Author, LabelKind.Review, LabelKind.Delegated, LabelKind.Bors, LabelKind.WIP]]):
+        if mask & _LABEL_BIT[LabelKind.Decision] and mask & _DECISION_CONFLICT_MASK:
             return PRStatus.Contradictory
         # Work in progress contradicts "awaiting review" and "ready for bors".
-        if LabelKind.WIP in labels and any([l for l in labels if l in [LabelKind.Review, LabelKind.Bors]]):
+        if mask & _LABEL_BIT[LabelKind.WIP] and mask & _WIP_CONFLICT_MASK:
             return PRStatus.Contradictory
         # Waiting for the author and review is also contradictory,
-        if LabelKind.Author in labels and LabelKind.Review in labels:
+        if (mask & _AUTHOR_REVIEW_MASK) == _AUTHOR_REVIEW_MASK:
             return PRStatus.Contradictory
         # as is being ready for merge and blocked
-        if LabelKind.Bors in labels and LabelKind.Blocked in labels:
+        if (mask & _BORS_BLOCKED_MASK) == _BORS_BLOCKED_MASK:
             return PRStatus.Contradictory
         # or being ready for merge and looking for help.
-        if LabelKind.Bors in labels and LabelKind.HelpWanted in labels:
+        if (mask & _BORS_HELP_WANTED_MASK) == _BORS_HELP_WANTED_MASK:
             return PRStatus.Contradictory
 
-        # If the set of labels is not contradictory, we use a clear priority order:
-        # from highest to lowest priority, the label kinds are ordered as
-        # blocked > help wanted > WIP > decision > merge conflict > bors > author; review > delegate.
-        # We can simply use Python's sorting to find the highest priority label.
-        key: dict[LabelKind, int] = {
-            LabelKind.Blocked: 11,
-            LabelKind.HelpWanted: 10,
-            LabelKind.WIP: 9,
-            LabelKind.Decision: 8,
-            LabelKind.MergeConflict: 7,
-            LabelKind.Bors: 6,
-            LabelKind.Author: 5,
-            LabelKind.Review: 5,
-            LabelKind.Delegated: 4,
-        }
-        sorted_labels = sorted(labels, key=lambda k: key[k], reverse=True)
-        return label_to_prstatus(sorted_labels[0])
+        # If the set of labels is not contradictory, we use the priority order above:
+        # the label kind of highest priority determines the PR's status.
+        labels = [kind for (bit, kind) in _KIND_OF_BIT.items() if mask & bit]
+        return _LABEL_TO_STATUS[max(labels, key=_LABEL_PRIORITY.__getitem__)]
+
+
+# There are only a few hundred possible label masks, so we classify each of them once
+# and look up the result when determining a PR's status.
+# The empty mask has no entry, as its status depends on the date.
+_STATUS_BY_MASK: List[Optional[PRStatus]] = [None] + [
+    _classify_label_mask(mask) for mask in range(1, 1 << len(_KIND_OF_BIT))
+]
+
+
+# The date the awaiting-review label was retired: see `determine_PR_status`.
+_REVIEW_CUTOFF = datetime(2024, 7, 9)
+
+
+def determine_PR_status(date: datetime, state: PRState) -> PRStatus:
+    '''Determine a PR's status from its state
+    'date' is necessary as the interpretation of the awaiting-review label changes over time'''
+    if state.draft or state.ci is CIStatus.Fail:
+        return PRStatus.NotReady
+    # "Other" labels are not relevant for this anyway, and are ignored by the label mask.
+    mask = state._mask
+    if mask == 0:
+        # Until July 9th, a PR had to be labelled awaiting-review to be marked as such.
+        # After that date, the label is retired and PRs are considered ready for review
+        # by default.
+        if date > _REVIEW_CUTOFF:
+            return PRStatus.AwaitingReview
+        else:
+            return PRStatus.AwaitingAuthor
+    return _STATUS_BY_MASK[mask]
 
 
 def test_determine_status() -> None:
     # NB: this only tests the new handling of awaiting-review status.
     default_date = datetime(2024, 8, 1)
-    def check(labels: List[LabelKind], expected: PRStatus) -> None:
+    def check(labels: Iterable[LabelKind], expected: PRStatus) -> None:
         state = PRState.with_labels(labels)
         actual = determine_PR_status(default_date, state)
         assert expected == actual, f"expected PR status {expected} from labels {labels}, got {actual}"
@@ -181,59 +244,65 @@ def test_determine_status() -> None:
         assert expected == actual, f"expected PR status {expected} from state {state}, got {actual}"
     # Check if the PR status on a given list of labels in one of several allowed values.
     # If successful, returns the actual PR status computed.
-    def check_flexible(labels: List[LabelKind], allowed: List[PRStatus]) -> PRStatus:
-        state = PRState(labels, CIStatus.Pass, False)
+    def check_flexible(labels: Iterable[LabelKind], allowed: List[PRStatus]) -> PRStatus:
+        state = PRState(tuple(labels), CIStatus.Pass, False)
         actual = determine_PR_status(default_date, state)
         assert actual in allowed, f"expected PR status in {allowed} from labels {labels}, got {actual}"
         return actual
 
     # Tests for handling draft and CI state.
     # These take precedence over any other labels.
-    check2(PRState([], CIStatus.Pass, True), PRStatus.NotReady)
-    check2(PRState([], CIStatus.Fail, False), PRStatus.NotReady)
-    check2(PRState([], CIStatus.Fail, True), PRStatus.NotReady)
+    check2(PRState((), CIStatus.Pass, True), PRStatus.NotReady)
+    check2(PRState((), CIStatus.Fail, False), PRStatus.NotReady)
+    check2(PRState((), CIStatus.Fail, True), PRStatus.NotReady)
     # Running CI is treated as "passing" for the purposes of our classification.
-    check2(PRState([], CIStatus.Running, False), PRStatus.AwaitingReview)
-    check2(PRState([LabelKind.WIP], CIStatus.Fail, False), PRStatus.NotReady)
-    check2(PRState([LabelKind.MergeConflict], CIStatus.Fail, False), PRStatus.NotReady)
+    check2(PRState((), CIStatus.Running, False), PRStatus.AwaitingReview)
+    check2(PRState((LabelKind.WIP,), CIStatus.Fail, False), PRStatus.NotReady)
+    check2(PRState((LabelKind.MergeConflict,), CIStatus.Fail, False), PRStatus.NotReady)
 
     # All label kinds we distinguish.
-    ALL = LabelKind._member_map_.values()
+    ALL = tuple(LabelKind)
+    # The status associated to each label kind, except for "other".
+    STATUS = {l: label_to_prstatus(l) for l in ALL if l is not LabelKind.Other}
     # For each combination of labels, the resulting PR status is either contradictory
     # or the status associated to some label.
-    # The order of adding labels does not matter.
+    # The order of adding labels does not matter: hence, we classify each multiset of labels
+    # just once, and separately check that permuting the labels does not change the result.
     check([], PRStatus.AwaitingReview)
     check([LabelKind.Other], PRStatus.AwaitingReview)
     check([LabelKind.Other, LabelKind.Other], PRStatus.AwaitingReview)
     check([LabelKind.Other, LabelKind.Other, LabelKind.Other], PRStatus.AwaitingReview)
-    for a in ALL:
-        if a != LabelKind.Other:
-            check([a], label_to_prstatus(a))
-        for b in ALL:
-            statusses = [label_to_prstatus(l) for l in [a, b] if l != LabelKind.Other]
-            # The "other" kind has no associated PR state: continue if all labels are "other"
+    for (a, status) in STATUS.items():
+        check([a], status)
+    # The status of each pair of labels, in the order produced by `combinations_with_replacement`.
+    result_pairs: dict[Tuple[LabelKind, LabelKind], PRStatus] = {}
+    for (a, b) in itertools.combinations_with_replacement(ALL, 2):
+        statusses = [STATUS[l] for l in (a, b) if l in STATUS]
+        # The "other" kind has no associated PR state: continue if all labels are "other"
+        if not statusses:
+            continue
+        actual = check_flexible([a, b], statusses + [PRStatus.Contradictory])
+        check([b, a], actual)
+        result_pairs[(a, b)] = actual
+    for labels in itertools.combinations_with_replacement(ALL, 3):
+        # Adding further labels to some contradictory status remains contradictory.
+        if any(result_pairs.get(pair) is PRStatus.Contradictory for pair in itertools.combinations(labels, 2)):
+            check(labels, PRStatus.Contradictory)
+        else:
+            statusses = [STATUS[l] for l in labels if l in STATUS]
             if not statusses:
                 continue
-            actual = check_flexible([a, b], statusses + [PRStatus.Contradictory])
-            check([b, a], actual)
-            result_ab = actual
-            for c in ALL:
-                # Adding further labels to some contradictory status remains contradictory.
-                if result_ab == PRStatus.Contradictory:
-                    check([a, b, c], PRStatus.Contradictory)
-                else:
-                    statusses = [label_to_prstatus(l) for l in [a, b, c] if l != LabelKind.Other]
-                    if not statusses:
-                        continue
-                    actual = check_flexible([a, b, c], statusses + [PRStatus.Contradictory])
-                    check([a, c, b], actual)
-                    check([b, a, c], actual)
-                    check([b, c, a], actual)
-                    check([c, a, b], actual)
-                    check([c, b, a], actual)
+            check_flexible(labels, statusses + [PRStatus.Contradictory])
+    # Spot-check that the order of labels does not matter, for a non-contradictory
+    # and a contradictory set of labels.
+    for labels in itertools.permutations([LabelKind.Blocked, LabelKind.MergeConflict, LabelKind.Delegated]):
+        check(labels, PRStatus.Blocked)
+    for labels in itertools.permutations([LabelKind.WIP, LabelKind.Bors, LabelKind.Other]):
+        check(labels, PRStatus.Contradictory)
     # One specific sanity check, which fails in the previous implementation.
     check([LabelKind.Blocked, LabelKind.Review], PRStatus.Blocked)
     check([LabelKind.Review, LabelKind.Blocked], PRStatus.Blocked)
 
 
-# test_determine_status()
\ No newline at end of file
+if __name__ == "__main__":
+    test_determine_status()
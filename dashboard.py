@@ -4,6 +4,7 @@
 
 import json
 import sys
+from collections import Counter
 from datetime import datetime, timezone
 from enum import Enum, auto, unique
 from typing import List, NamedTuple, Tuple
@@ -153,11 +154,13 @@ def main() -> None:
 
 
 def gather_pr_statistics(dataFilesWithKind: List[Tuple[dict, PRList]], all_ready_prs: dict, all_draft_prs: dict) -> str:
+    # All PRs are classified as of the same point in time.
+    now = datetime.now()
     def determine_status(info: BasicPRInformation, is_draft: bool) -> PRStatus:
         # Ignore all "other" labels, which are not relevant for this anyway.
-        labels = [label_categorisation_rules[l.name] for l in info.labels if l.name in label_categorisation_rules]
+        labels = tuple(kind for l in info.labels if (kind := label_categorisation_rules.get(l.name)) is not None)
         state = PRState(labels, CIStatus.Pass, is_draft)
-        return determine_PR_status(datetime.now(), state)
+        return determine_PR_status(now, state)
 
     ready_prs : List[BasicPRInformation] = _extract_prs([all_ready_prs])
     # Collect the status of every ready PR.
@@ -180,8 +183,10 @@ def gather_pr_statistics(dataFilesWithKind: List[Tuple[dict, PRList]], all_ready
         PRStatus.Contradictory,
         PRStatus.Delegated, PRStatus.AwaitingBors,
     ]
+    # Count all ready PRs by status in a single pass.
+    status_counts = Counter(ready_pr_status.values())
     number_prs : dict[PRStatus, int] = {
-        status : len([number for number in ready_pr_status if ready_pr_status[number] == status]) for status in statusses
+        status : status_counts[status] for status in statusses
     }
     number_prs[PRStatus.NotReady] += len(draft_prs)
     # Check that we did not miss any variant above
@@ -447,23 +452,23 @@ def print_dashboard_bad_labels_title(data : dict) -> None:
     with_bad_title = [pr for pr in all_prs if not pr.title.startswith(("feat", "chore", "perf", "refactor", "style", "fix", "doc"))]
     # Whether a PR has a "topic" label.
     def has_topic_label(pr: BasicPRInformation) -> bool:
-        topic_labels = [l for l in pr.labels if l.name == 'CI' or l.name.startswith("t-")]
-        return len(topic_labels) >= 1
+        return any(l.name == 'CI' or l.name.startswith("t-") for l in pr.labels)
     prs_without_topic_label = [pr for pr in all_prs if pr.title.startswith("feat") and not has_topic_label(pr)]
 
+    # Combine common labels.
+    canonicalise = {
+        "ready-to-merge": "bors", "auto-merge-after-CI": "bors",
+        "blocked-by-other-PR": "blocked", "blocked-by-core-PR": "blocked", "blocked-by-batt-PR": "blocked", "blocked-by-qq-PR": "blocked",
+    }
+    # Labels which contradict waiting for a decision.
+    decision_conflicts = frozenset({"awaiting-author", "delegated", "bors", "WIP"})
     def has_contradictory_labels(pr: BasicPRInformation) -> bool:
-        # Combine common labels.
-        canonicalise = {
-            "ready-to-merge": "bors", "auto-merge-after-CI": "bors",
-            "blocked-by-other-PR": "blocked", "blocked-by-core-PR": "blocked", "blocked-by-batt-PR": "blocked", "blocked-by-qq-PR": "blocked",
-        }
-        normalised_labels = [(canonicalise[l.name] if l.name in canonicalise else l.name) for l in pr.labels]
+        normalised_labels = {canonicalise.get(l.name, l.name) for l in pr.labels}
         # Test for contradictory label combinations.
         if 'awaiting-review-DONT-USE' in normalised_labels:
             return True
         # Waiting for a decision contradicts most other labels.
-        elif "awaiting-zulip" in normalised_labels and any(
-                [l for l in normalised_labels if l in ["awaiting-author", "delegated", "bors", "WIP"]]):
+        elif "awaiting-zulip" in normalised_labels and not decision_conflicts.isdisjoint(normalised_labels):
             return True
         elif "WIP" in normalised_labels and ("awaiting-review" in normalised_labels or "bors" in normalised_labels):
             return True